@@ -0,0 +1,11 @@
+import os
+
+bind = "0.0.0.0:8000"
+
+# I/O-bound async workers; each runs its own event loop and asyncpg pool
+workers = 2 * os.cpu_count() + 1
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Keep client connections open between requests so repeat API calls skip
+# the TCP/TLS handshake; 65s outlasts common 60s client/proxy idle timeouts
+keepalive = 65
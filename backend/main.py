@@ -1,7 +1,11 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-from functools import wraps
+from quart import Quart, Response, request, jsonify
+from quart.json.provider import JSONProvider
+from quart_cors import cors
+import orjson
+from werkzeug.security import check_password_hash
+import bcrypt
+from dataclasses import dataclass
+from functools import wraps, lru_cache
 import jwt  # This should now work with PyJWT
 from datetime import datetime, timedelta, timezone
 import os
@@ -12,6 +16,8 @@ import paypalrestsdk
 import asyncio
 from typing import Optional, List
 import re
+import hashlib
+from cachetools import TTLCache
 
 load_dotenv()
 
@@ -30,31 +36,68 @@ if paypal_client_id and paypal_client_secret:
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-async def get_db_connection():
-    return await asyncpg.connect(DATABASE_URL)
+# Shared connection pool - created lazily on first query so it lives on the
+# running event loop. Pooling avoids paying TCP/TLS/auth setup per request and
+# lets asyncpg's per-connection statement cache actually hit. Sizes are
+# env-tunable so deployments can match their Postgres connection budget.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+async def _init_connection(conn):
+    # Decode numeric columns straight to float at the driver level so
+    # handlers don't need per-row Decimal-to-float conversion passes
+    await conn.set_type_codec(
+        'numeric', encoder=str, decoder=float, schema='pg_catalog', format='text'
+    )
+
+async def get_pool():
+    global _pool
+    if _pool is None:
+        # Serialize creation: without the lock, concurrent first requests
+        # would each build a pool and the losers would leak connections
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+                    init=_init_connection
+                )
+    return _pool
 
 async def sql(query: str, params: list = None):
-    conn = await get_db_connection()
-    try:
+    pool = await get_pool()
+    async with pool.acquire() as conn:
         if params:
             result = await conn.fetch(query, *params)
         else:
             result = await conn.fetch(query)
         return [dict(record) for record in result]
-    finally:
-        await conn.close()
-
-def run_async(func):
-    """Decorator to run async functions in Flask routes"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(func(*args, **kwargs))
-        finally:
-            loop.close()
-    return wrapper
+
+async def sql_one(query: str, params: list = None):
+    """Fetch at most one row as a dict (None if the query matched nothing)."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(query, *(params or []))
+        return dict(row) if row is not None else None
+
+async def sql_val(query: str, params: list = None):
+    """Fetch a single scalar value (None if the query matched nothing)."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetchval(query, *(params or []))
+
+async def insert_order_items(conn, order_id, cart_items):
+    """Insert all line items for an order in one executemany round-trip."""
+    await conn.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES ($1, $2, $3, $4)",
+        [(order_id, item["product_id"], item["quantity"], item["price"]) for item in cart_items]
+    )
 
 # Security
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
@@ -62,18 +105,36 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-app = Flask(__name__)
+class OrJSONProvider(JSONProvider):
+    """JSON provider backed by orjson: one C-level pass over response data
+    instead of the stdlib encoder's Python-level traversal."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+app = Quart(__name__)
 app.config['SECRET_KEY'] = SECRET_KEY
+app.json = OrJSONProvider(app)
 
-# CORS setup
-CORS(app, origins=[
+# CORS setup - an explicit origin set; a "*" wildcard is ignored by browsers
+# when credentials are allowed, so listing it only cost extra per-request work
+ALLOWED_ORIGINS = {
     "http://localhost:3000",
     "https://localhost:3000",
     "https://localhost:3001",
     "https://kommercio.netlify.app",
     "https://www.kommercio.netlify.app",
-    "*"
-], supports_credentials=True)
+}
+app = cors(app, allow_origin=ALLOWED_ORIGINS, allow_credentials=True)
+
+@app.before_serving
+async def _create_pool():
+    # Build the pool on the worker's event loop before traffic arrives so
+    # the first request doesn't pay connection setup
+    await get_pool()
 
 # Enums
 class UserRole(str, Enum):
@@ -81,10 +142,58 @@ class UserRole(str, Enum):
     VENDOR = "vendor"
     ADMIN = "admin"
 
+@dataclass(slots=True, frozen=True)
+class AuthUser:
+    """Authenticated requester, built once per request by token_required.
+
+    Slotted and frozen: attribute reads are a single pointer fetch instead
+    of a dict probe, and cached instances can't be mutated by handlers.
+    """
+    id: int
+    email: str
+    username: str
+    role: str
+
+class OrderStatus(str, Enum):
+    CREATED = "created"
+    CONFIRMED = "confirmed"
+    SHIPPED = "shipped"
+    DELIVERED = "delivered"
+    CANCELLED = "cancelled"
+    PENDING_PAYMENT = "pending_payment"
+
+# Order status validation - a hashed-set lookup and a pre-rendered error
+# message instead of rebuilding a list per request. Members are str-backed
+# so DB values compare directly without a round-trip through the enum.
+VALID_STATUSES = frozenset(s.value for s in OrderStatus)
+VALID_STATUSES_MSG = "Invalid status. Must be one of: " + ", ".join(sorted(VALID_STATUSES))
+
+# Fixed success messages, encoded once at import time. Response objects are
+# mutated by the server per request, so only the bytes are shared; each call
+# wraps them in a fresh Response
+_CANCEL_OK_BYTES = orjson.dumps({"message": "Order cancelled successfully"})
+_STATUS_OK_BYTES = {
+    s: orjson.dumps({"message": f"Order status updated to {s}"})
+    for s in VALID_STATUSES
+}
+
+def _json_response(body):
+    return Response(body, mimetype="application/json")
+
 # Utility functions
+def hash_password(password):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=12)).decode()
+
+def verify_password(password, hashed):
+    if hashed.startswith("$2"):
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    # Legacy werkzeug (PBKDF2) hashes created before the bcrypt switch
+    return check_password_hash(hashed, password)
+
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 def validate_email(email):
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -103,60 +212,253 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Auth cache - avoids re-decoding the JWT and re-fetching the user row on
+# every authenticated request. Keyed by a hash of the raw token; entries live
+# for at most AUTH_CACHE_TTL seconds and never past the token's own expiry.
+# In-process rather than Redis: the app runs as independent workers with no
+# shared cache tier, and a per-worker TTL cache gives the same DB offload
+# without a network hop per hit.
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "30"))
+_auth_cache = TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL)
+
+def invalidate_user(user_id):
+    """Drop cached auth entries for a user after profile/password changes."""
+    for token_hash, (user, _) in list(_auth_cache.items()):
+        if user.id == user_id:
+            _auth_cache.pop(token_hash, None)
+
+# Product caches - the catalog is read-mostly and the same list pages are
+# requested by every visitor, so serve repeats from memory for a few seconds.
+# Vendor write endpoints invalidate.
+_products_cache = TTLCache(maxsize=1024, ttl=15)
+_product_detail_cache = TTLCache(maxsize=4096, ttl=15)
+
+def invalidate_product_caches(product_id=None):
+    _products_cache.clear()
+    if product_id is not None:
+        _product_detail_cache.pop(product_id, None)
+
+# Order detail cache - order status is polled far more often than it changes.
+# Keyed by (order_id, user_id); the cancel/status mutations invalidate so
+# readers never see a stale status beyond the few-second TTL.
+_order_cache = TTLCache(maxsize=4096, ttl=5)
+
+def invalidate_order(order_id):
+    for key in list(_order_cache):
+        if key[0] == order_id:
+            _order_cache.pop(key, None)
+
+# Hot-path queries as module-level constants: asyncpg's per-connection
+# prepared-statement cache is keyed on query text, so issuing byte-identical
+# SQL lets Postgres reuse the parsed plan across requests
+PRODUCT_COLUMNS = "id, name, description, price, stock, category, image_url, created_at, vendor_id"
+
+# Explicit column lists: users.* would drag hashed_password over the wire
+# (and into the auth cache) on every authenticated request
+Q_USER_BY_EMAIL_AND_ID = "SELECT id, email, username, role FROM users WHERE email = $1 AND id = $2"
+Q_USER_BY_EMAIL = "SELECT id, email, hashed_password FROM users WHERE email = $1"
+Q_PRODUCT_BY_ID = f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id = $1 AND is_active = true"
+Q_CART_ITEMS_BY_USER = """
+    SELECT ci.id, ci.product_id, ci.quantity, p.name, p.price, p.image_url
+    FROM cart_items ci
+    JOIN products p ON ci.product_id = p.id
+    WHERE ci.user_id = $1
+"""
+Q_USER_ORDERS = """
+    SELECT o.id, o.total_amount, o.status, o.created_at, o.payment_intent_id,
+           COUNT(oi.id) as item_count
+    FROM orders o
+    LEFT JOIN order_items oi ON o.id = oi.order_id
+    WHERE o.user_id = $1 AND o.status != 'pending_payment'
+    GROUP BY o.id, o.total_amount, o.status, o.created_at, o.payment_intent_id
+    ORDER BY o.created_at DESC
+    LIMIT $2 OFFSET $3
+"""
+Q_ORDER_ITEMS_FOR_ORDERS = """
+    SELECT oi.order_id, oi.id, oi.product_id, oi.quantity, oi.price,
+           p.name as product_name, p.image_url
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.id
+    WHERE oi.order_id = ANY($1::int[])
+"""
+Q_ORDER_ITEMS = """
+    SELECT oi.id, oi.product_id, oi.quantity, oi.price,
+           p.name as product_name, p.image_url
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.id
+    WHERE oi.order_id = $1
+"""
+Q_ORDER_BY_ID_AND_USER = """
+    SELECT o.id, o.total_amount, o.status, o.created_at, o.payment_intent_id, o.version
+    FROM orders o
+    WHERE o.id = $1 AND o.user_id = $2
+"""
+# LIMIT 1 plus the covering index from migration 004 (id, user_id
+# INCLUDE status, version) keeps this failure-path lookup index-only
+Q_ORDER_STATUS = "SELECT status, version FROM orders WHERE id = $1 AND user_id = $2 LIMIT 1"
+Q_ORDER_VERSION = "SELECT version FROM orders WHERE id = $1"
+Q_CANCEL_ORDER = """
+    UPDATE orders SET status = 'cancelled', version = version + 1
+    WHERE id = $1 AND user_id = $2 AND status IN ('created', 'pending_payment')
+    RETURNING version
+"""
+Q_CANCEL_ORDER_IF_MATCH = """
+    UPDATE orders SET status = 'cancelled', version = version + 1
+    WHERE id = $1 AND user_id = $2 AND status IN ('created', 'pending_payment')
+      AND version = $3
+    RETURNING version
+"""
+# Authorization rides inside the UPDATE: admins may touch any order, vendors
+# only orders containing one of their products. Atomic with the mutation, so
+# there is no separate ownership query on the success path.
+Q_UPDATE_ORDER_STATUS = """
+    UPDATE orders SET status = $1, version = version + 1
+    WHERE id = $2
+      AND ($3 = 'admin' OR EXISTS (
+          SELECT 1 FROM order_items oi
+          JOIN products p ON p.id = oi.product_id
+          WHERE oi.order_id = orders.id AND p.vendor_id = $4))
+    RETURNING version
+"""
+# Same authorization predicate as Q_UPDATE_ORDER_STATUS, applied per row;
+# unnest turns the batch into one statement so RETURNING reports which
+# orders were actually hit
+Q_BULK_UPDATE_ORDER_STATUS = """
+    UPDATE orders SET status = u.status, version = version + 1
+    FROM unnest($1::text[], $2::int[]) AS u(status, id)
+    WHERE orders.id = u.id
+      AND ($3 = 'admin' OR EXISTS (
+          SELECT 1 FROM order_items oi
+          JOIN products p ON p.id = oi.product_id
+          WHERE oi.order_id = orders.id AND p.vendor_id = $4))
+    RETURNING orders.id
+"""
+Q_UPDATE_ORDER_STATUS_IF_MATCH = """
+    UPDATE orders SET status = $1, version = version + 1
+    WHERE id = $2
+      AND ($3 = 'admin' OR EXISTS (
+          SELECT 1 FROM order_items oi
+          JOIN products p ON p.id = oi.product_id
+          WHERE oi.order_id = orders.id AND p.vendor_id = $4))
+      AND version = $5
+    RETURNING version
+"""
+
+def _if_match_version(headers):
+    """Parse If-Match into an integer order version.
+
+    Returns None when the header is absent; raises ValueError when it is
+    present but not a quoted integer ETag as issued by these endpoints.
+    """
+    etag = headers.get('If-Match')
+    if etag is None:
+        return None
+    return int(etag.strip().strip('"'))
+
+def _build_products_query(has_category, has_search):
+    query = f"SELECT {PRODUCT_COLUMNS}, COUNT(*) OVER () AS __total FROM products WHERE is_active = true"
+    n = 0
+    if has_category:
+        n += 1
+        query += f" AND category = ${n}"
+    if has_search:
+        n += 1
+        query += f" AND name ILIKE ${n}"
+    return query + f" ORDER BY created_at DESC LIMIT ${n + 1} OFFSET ${n + 2}"
+
+def _build_products_count_query(has_category, has_search):
+    query = "SELECT COUNT(*) FROM products WHERE is_active = true"
+    n = 0
+    if has_category:
+        n += 1
+        query += f" AND category = ${n}"
+    if has_search:
+        n += 1
+        query += f" AND name ILIKE ${n}"
+    return query
+
+# The products list has only four filter shapes - precompute them all so the
+# same shape always produces the same SQL text. The count variants back the
+# out-of-range-page fallback, where the window total returns no rows.
+_PRODUCTS_QUERIES = {
+    (has_category, has_search): _build_products_query(has_category, has_search)
+    for has_category in (False, True)
+    for has_search in (False, True)
+}
+_PRODUCTS_COUNT_QUERIES = {
+    key: _build_products_count_query(*key) for key in _PRODUCTS_QUERIES
+}
+
+# Shared decode arguments: a tuple and dict built once instead of fresh
+# allocations per call, with required claims enforced at decode time
+_ALGS = (ALGORITHM,)
+_JWT_OPTS = {"require": ["exp", "sub", "user_id"]}
+
+@lru_cache(maxsize=8192)
+def _decode_token(token):
+    """Decode and verify a JWT. Payloads are immutable so results are
+    memoized; callers must re-check exp since cached hits skip validation."""
+    return jwt.decode(token, SECRET_KEY, algorithms=_ALGS, options=_JWT_OPTS)
+
 def token_required(f):
+    """Single auth wrapper: one closure frame per request, awaiting the
+    handler directly on the running loop (no thread/loop hand-off)."""
     @wraps(f)
-    def decorated(*args, **kwargs):
+    async def decorated(*args, **kwargs):
         token = None
         auth_header = request.headers.get('Authorization')
-        
+
         if auth_header:
             try:
                 token = auth_header.split(" ")[1]  # Bearer <token>
             except IndexError:
                 return jsonify({'message': 'Token format invalid!'}), 401
-        
+
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
-        
+
+        token_hash = hashlib.sha256(token.encode()).digest()
+        cached = _auth_cache.get(token_hash)
+        if cached is not None:
+            current_user, exp = cached
+            if exp > datetime.now(timezone.utc).timestamp():
+                return await f(current_user, *args, **kwargs)
+            _auth_cache.pop(token_hash, None)
+
         try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            data = _decode_token(token)
+            if data["exp"] <= datetime.now(timezone.utc).timestamp():
+                raise jwt.ExpiredSignatureError("Token has expired")
             email = data.get('sub')
             user_id = data.get('user_id')
-            
+
             if not email or not user_id:
                 return jsonify({'message': 'Token is invalid!'}), 401
-                
+
             # Get user from database
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                user = loop.run_until_complete(
-                    sql("SELECT * FROM users WHERE email = $1 AND id = $2", [email, user_id])
-                )
-                if not user:
-                    return jsonify({'message': 'User not found!'}), 401
-                current_user = user[0]
-            finally:
-                loop.close()
-            
+            row = await sql_one(Q_USER_BY_EMAIL_AND_ID, [email, user_id])
+            if row is None:
+                return jsonify({'message': 'User not found!'}), 401
+            current_user = AuthUser(**row)
+            _auth_cache[token_hash] = (current_user, data["exp"])
+
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token has expired!'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'message': 'Token is invalid!'}), 401
-        
-        return f(current_user, *args, **kwargs)
+
+        return await f(current_user, *args, **kwargs)
     return decorated
 
 # Health check endpoints
 @app.route('/')
-def root():
-    return jsonify({"message": "E-commerce API is running on Flask!", "status": "healthy"})
+async def root():
+    return jsonify({"message": "E-commerce API is running on Quart!", "status": "healthy"})
 
 @app.route('/health')
-@run_async
 async def health_check():
     try:
-        result = await sql("SELECT 1 as test")
+        result = await sql_val("SELECT 1")
         return jsonify({
             "status": "healthy",
             "database": "connected" if result else "disconnected",
@@ -172,9 +474,8 @@ async def health_check():
 
 # Auth endpoints
 @app.route('/auth/signup', methods=['POST'])
-@run_async
 async def signup():
-    data = request.get_json()
+    data = await request.get_json()
     
     if not data:
         return jsonify({"message": "No data provided"}), 400
@@ -190,29 +491,27 @@ async def signup():
     if not validate_email(email):
         return jsonify({"message": "Invalid email format"}), 400
     
-    # Check if user exists
-    existing_user = await sql("SELECT id FROM users WHERE email = $1", [email])
-    if existing_user:
-        return jsonify({"message": "Email already registered"}), 400
-    
-    # Check if username exists
-    existing_username = await sql("SELECT id FROM users WHERE username = $1", [username])
-    if existing_username:
-        return jsonify({"message": "Username already taken"}), 400
-    
-    # Hash password and create user
-    hashed_password = generate_password_hash(password)
-    result = await sql(
-        "INSERT INTO users (email, username, hashed_password, role) VALUES ($1, $2, $3, $4) RETURNING id",
+    # Hash password and create user; the database enforces uniqueness
+    # atomically instead of separate existence-check queries. Hashing is a
+    # deliberate CPU burst, so run it off the event loop.
+    hashed_password = await asyncio.to_thread(hash_password, password)
+    user_id = await sql_val(
+        """INSERT INTO users (email, username, hashed_password, role) VALUES ($1, $2, $3, $4)
+           ON CONFLICT DO NOTHING RETURNING id""",
         [email, username, hashed_password, role]
     )
-    
-    return jsonify({"message": "User created successfully", "user_id": result[0]["id"]}), 201
+
+    if user_id is None:
+        # Only on the conflict path: find out which unique column collided
+        if await sql_val("SELECT 1 FROM users WHERE email = $1", [email]) is not None:
+            return jsonify({"message": "Email already registered"}), 400
+        return jsonify({"message": "Username already taken"}), 400
+
+    return jsonify({"message": "User created successfully", "user_id": user_id}), 201
 
 @app.route('/auth/token', methods=['POST'])
-@run_async
 async def login():
-    data = request.get_json()
+    data = await request.get_json()
     
     if not data:
         return jsonify({"message": "No data provided"}), 400
@@ -223,17 +522,17 @@ async def login():
     if not email or not password:
         return jsonify({"message": "Email and password are required"}), 400
     
-    user = await sql("SELECT * FROM users WHERE email = $1", [email])
-    if not user or not check_password_hash(user[0]["hashed_password"], password):
+    user = await sql_one(Q_USER_BY_EMAIL, [email])
+    if user is None or not await asyncio.to_thread(verify_password, password, user["hashed_password"]):
         return jsonify({"message": "Incorrect email or password"}), 401
-    
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user[0]["email"], "user_id": user[0]["id"]}, 
+        data={"sub": user["email"], "user_id": user["id"]},
         expires_delta=access_token_expires
     )
     refresh_token = create_refresh_token(
-        data={"sub": user[0]["email"], "user_id": user[0]["id"]}
+        data={"sub": user["email"], "user_id": user["id"]}
     )
     
     return jsonify({
@@ -243,16 +542,17 @@ async def login():
     })
 
 @app.route('/auth/refresh', methods=['POST'])
-@run_async
 async def refresh_token():
-    data = request.get_json()
+    data = await request.get_json()
     refresh_token = data.get('refresh_token')
     
     if not refresh_token:
         return jsonify({"message": "Refresh token is required"}), 400
     
     try:
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(refresh_token)
+        if payload["exp"] <= datetime.now(timezone.utc).timestamp():
+            raise jwt.ExpiredSignatureError("Refresh token has expired")
         email = payload.get("sub")
         user_id = payload.get("user_id")
         if email is None or user_id is None:
@@ -262,17 +562,17 @@ async def refresh_token():
     except jwt.InvalidTokenError:
         return jsonify({"message": "Invalid refresh token"}), 401
     
-    user = await sql("SELECT * FROM users WHERE email = $1 AND id = $2", [email, user_id])
-    if not user:
+    user = await sql_one(Q_USER_BY_EMAIL_AND_ID, [email, user_id])
+    if user is None:
         return jsonify({"message": "User not found"}), 401
-    
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user[0]["email"], "user_id": user[0]["id"]}, 
+        data={"sub": user["email"], "user_id": user["id"]},
         expires_delta=access_token_expires
     )
     new_refresh_token = create_refresh_token(
-        data={"sub": user[0]["email"], "user_id": user[0]["id"]}
+        data={"sub": user["email"], "user_id": user["id"]}
     )
     
     return jsonify({
@@ -283,81 +583,82 @@ async def refresh_token():
 
 @app.route('/auth/me', methods=['GET'])
 @token_required
-def get_current_user_info(current_user):
+async def get_current_user_info(current_user):
     return jsonify({
-        "id": current_user["id"],
-        "email": current_user["email"],
-        "username": current_user["username"],
-        "role": current_user["role"]
+        "id": current_user.id,
+        "email": current_user.email,
+        "username": current_user.username,
+        "role": current_user.role
     })
 
 @app.route('/auth/profile', methods=['PUT'])
 @token_required
-@run_async
 async def update_profile(current_user):
-    data = request.get_json()
+    data = await request.get_json()
     
     if not data:
         return jsonify({
-            "id": current_user["id"],
-            "email": current_user["email"],
-            "username": current_user["username"],
-            "role": current_user["role"]
+            "id": current_user.id,
+            "email": current_user.email,
+            "username": current_user.username,
+            "role": current_user.role
         })
     
     update_fields = []
     params = []
     param_count = 1
-    
-    for field, value in data.items():
-        if field in ['username', 'email'] and value:
-            if field == "email":
-                if not validate_email(value):
-                    return jsonify({"message": "Invalid email format"}), 400
-                # Check if email already exists
-                existing_email = await sql(
-                    "SELECT id FROM users WHERE email = $1 AND id != $2", 
-                    [value, current_user["id"]]
-                )
-                if existing_email:
-                    return jsonify({"message": "Email already registered"}), 400
-            elif field == "username":
-                # Check if username already exists
-                existing_username = await sql(
-                    "SELECT id FROM users WHERE username = $1 AND id != $2", 
-                    [value, current_user["id"]]
-                )
-                if existing_username:
-                    return jsonify({"message": "Username already taken"}), 400
-            
-            update_fields.append(f"{field} = ${param_count}")
-            params.append(value)
-            param_count += 1
+
+    # Iterate updatable fields in a fixed order so the same set of fields
+    # always builds the same UPDATE text (maximizes prepared-cache reuse)
+    for field in ('email', 'username'):
+        value = data.get(field)
+        if not value:
+            continue
+
+        if field == "email" and not validate_email(value):
+            return jsonify({"message": "Invalid email format"}), 400
+
+        update_fields.append(f"{field} = ${param_count}")
+        params.append(value)
+        param_count += 1
     
     if not update_fields:
         return jsonify({
-            "id": current_user["id"],
-            "email": current_user["email"],
-            "username": current_user["username"],
-            "role": current_user["role"]
+            "id": current_user.id,
+            "email": current_user.email,
+            "username": current_user.username,
+            "role": current_user.role
         })
     
-    query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ${param_count} RETURNING *"
-    params.append(current_user["id"])
-    
-    result = await sql(query, params)
+    query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ${param_count} RETURNING id, email, username, role"
+    params.append(current_user.id)
+
+    # The database enforces uniqueness atomically instead of separate
+    # existence-check queries, mirroring signup
+    try:
+        result = await sql_one(query, params)
+    except asyncpg.UniqueViolationError:
+        # Only on the conflict path: find out which unique column collided
+        email = data.get('email')
+        if email and await sql_val(
+            "SELECT 1 FROM users WHERE email = $1 AND id != $2",
+            [email, current_user.id]
+        ) is not None:
+            return jsonify({"message": "Email already registered"}), 400
+        return jsonify({"message": "Username already taken"}), 400
+
+    invalidate_user(current_user.id)
     return jsonify({
-        "id": result[0]["id"],
-        "email": result[0]["email"],
-        "username": result[0]["username"],
-        "role": result[0]["role"]
+        "id": result["id"],
+        "email": result["email"],
+        "username": result["username"],
+        "role": result["role"]
     })
 
 @app.route('/auth/password', methods=['PUT'])
 @token_required
-@run_async
 async def update_password(current_user):
-    data = request.get_json()
+    data = await request.get_json()
     
     current_password = data.get('current_password')
     new_password = data.get('new_password')
@@ -365,91 +666,83 @@ async def update_password(current_user):
     if not current_password or not new_password:
         return jsonify({"message": "Current password and new password are required"}), 400
     
-    # Verify current password
-    if not check_password_hash(current_user["hashed_password"], current_password):
+    # Verify current password (the hash is fetched here on demand; the auth
+    # path deliberately never selects it)
+    hashed = await sql_val("SELECT hashed_password FROM users WHERE id = $1", [current_user.id])
+    if not await asyncio.to_thread(verify_password, current_password, hashed):
         return jsonify({"message": "Incorrect current password"}), 400
-    
+
     # Hash new password
-    new_hashed_password = generate_password_hash(new_password)
-    
-    await sql("UPDATE users SET hashed_password = $1 WHERE id = $2", 
-             [new_hashed_password, current_user["id"]])
+    new_hashed_password = await asyncio.to_thread(hash_password, new_password)
     
+    await sql("UPDATE users SET hashed_password = $1 WHERE id = $2",
+             [new_hashed_password, current_user.id])
+
+    invalidate_user(current_user.id)
     return jsonify({"message": "Password updated successfully"})
 
 # Product endpoints
 @app.route('/products', methods=['GET'])
-@run_async
 async def get_products():
     skip = int(request.args.get('skip', 0))
     limit = int(request.args.get('limit', 20))
     category = request.args.get('category')
     search = request.args.get('search')
     
-    query = "SELECT * FROM products WHERE is_active = true"
+    cache_key = (category, search, skip, limit)
+    cached = _products_cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached)
+
+    has_category = bool(category and category != "all")
+    has_search = bool(search)
+
     params = []
-    
-    if category and category != "all":
-        query += " AND category = $" + str(len(params) + 1)
+    if has_category:
         params.append(category)
-    
-    if search:
-        query += " AND name ILIKE $" + str(len(params) + 1)
+    if has_search:
         params.append(f"%{search}%")
-    
-    query += " ORDER BY created_at DESC LIMIT $" + str(len(params) + 1) + " OFFSET $" + str(len(params) + 2)
     params.extend([limit, skip])
-    
-    products = await sql(query, params)
-    
-    # Convert price to float for all products
-    for product in products:
-        product["price"] = float(product["price"])
-    
-    # Get total count
-    count_query = "SELECT COUNT(*) as total FROM products WHERE is_active = true"
-    count_params = []
-    
-    if category and category != "all":
-        count_query += " AND category = $1"
-        count_params.append(category)
-    
-    if search:
-        if count_params:
-            count_query += " AND name ILIKE $2"
-        else:
-            count_query += " AND name ILIKE $1"
-        count_params.append(f"%{search}%")
-    
-    total_result = await sql(count_query, count_params)
-    total = total_result[0]["total"] if total_result else 0
-    
-    return jsonify({
+
+    products = await sql(_PRODUCTS_QUERIES[(has_category, has_search)], params)
+
+    if products:
+        total = products[0]["__total"]
+        for product in products:
+            product.pop("__total")
+    else:
+        # The window total only comes back with rows; any empty page
+        # (offset past the end, or limit=0) falls back to a count query so
+        # the reported total stays true
+        total = await sql_val(_PRODUCTS_COUNT_QUERIES[(has_category, has_search)], params[:-2])
+
+    payload = {
         "products": products,
         "total": total,
         "skip": skip,
         "limit": limit
-    })
+    }
+    _products_cache[cache_key] = payload
+    return jsonify(payload)
 
 @app.route('/products/<int:product_id>', methods=['GET'])
-@run_async
 async def get_product(product_id):
-    product = await sql("SELECT * FROM products WHERE id = $1 AND is_active = true", [product_id])
-    if not product:
-        return jsonify({"message": "Product not found"}), 404
-    
-    # Convert price to float
-    product[0]["price"] = float(product[0]["price"])
-    return jsonify(product[0])
+    product = _product_detail_cache.get(product_id)
+    if product is None:
+        product = await sql_one(Q_PRODUCT_BY_ID, [product_id])
+        if product is None:
+            return jsonify({"message": "Product not found"}), 404
+        _product_detail_cache[product_id] = product
+
+    return jsonify(product)
 
 @app.route('/vendor/products', methods=['POST'])
 @token_required
-@run_async
 async def create_product(current_user):
-    if current_user["role"] not in [UserRole.VENDOR.value, UserRole.ADMIN.value]:
+    if current_user.role not in [UserRole.VENDOR.value, UserRole.ADMIN.value]:
         return jsonify({"message": "Not authorized to create products"}), 403
     
-    data = request.get_json()
+    data = await request.get_json()
     
     name = data.get('name')
     description = data.get('description')
@@ -461,26 +754,26 @@ async def create_product(current_user):
     if not all([name, description, price is not None, stock is not None, category]):
         return jsonify({"message": "Name, description, price, stock, and category are required"}), 400
     
-    result = await sql(
-        """INSERT INTO products (name, description, price, stock, category, image_url, vendor_id) 
+    result = await sql_one(
+        """INSERT INTO products (name, description, price, stock, category, image_url, vendor_id)
            VALUES ($1, $2, $3, $4, $5, $6, $7) RETURNING *""",
-        [name, description, price, stock, category, image_url, current_user["id"]]
+        [name, description, price, stock, category, image_url, current_user.id]
     )
-    return jsonify(result[0]), 201
+    invalidate_product_caches()
+    return jsonify(result), 201
 
 @app.route('/vendor/products/<int:product_id>', methods=['PUT'])
 @token_required
-@run_async
 async def update_product(current_user, product_id):
     # Check if product exists and belongs to user
-    product = await sql("SELECT * FROM products WHERE id = $1", [product_id])
-    if not product:
+    product = await sql_one(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id = $1", [product_id])
+    if product is None:
         return jsonify({"message": "Product not found"}), 404
-    
-    if product[0]["vendor_id"] != current_user["id"] and current_user["role"] != UserRole.ADMIN.value:
+
+    if product["vendor_id"] != current_user.id and current_user.role != UserRole.ADMIN.value:
         return jsonify({"message": "Not authorized to update this product"}), 403
     
-    data = request.get_json()
+    data = await request.get_json()
     
     # Build update query dynamically
     update_fields = []
@@ -494,42 +787,37 @@ async def update_product(current_user, product_id):
             param_count += 1
     
     if not update_fields:
-        return jsonify(product[0])
-    
+        return jsonify(product)
+
     query = f"UPDATE products SET {', '.join(update_fields)} WHERE id = ${param_count} RETURNING *"
     params.append(product_id)
-    
-    result = await sql(query, params)
-    return jsonify(result[0])
+
+    result = await sql_one(query, params)
+    invalidate_product_caches(product_id)
+    return jsonify(result)
 
 @app.route('/vendor/products/<int:product_id>', methods=['DELETE'])
 @token_required
-@run_async
 async def delete_product(current_user, product_id):
-    product = await sql("SELECT * FROM products WHERE id = $1", [product_id])
-    if not product:
+    vendor_id = await sql_val("SELECT vendor_id FROM products WHERE id = $1", [product_id])
+    if vendor_id is None:
         return jsonify({"message": "Product not found"}), 404
-    
-    if product[0]["vendor_id"] != current_user["id"] and current_user["role"] != UserRole.ADMIN.value:
+
+    if vendor_id != current_user.id and current_user.role != UserRole.ADMIN.value:
         return jsonify({"message": "Not authorized to delete this product"}), 403
     
     await sql("UPDATE products SET is_active = false WHERE id = $1", [product_id])
+    invalidate_product_caches(product_id)
     return jsonify({"message": "Product deleted successfully"})
 
 # Cart endpoints
 @app.route('/cart', methods=['GET'])
 @token_required
-@run_async
 async def get_cart(current_user):
-    cart_items = await sql("""
-        SELECT ci.*, p.name, p.price, p.image_url 
-        FROM cart_items ci 
-        JOIN products p ON ci.product_id = p.id 
-        WHERE ci.user_id = $1
-    """, [current_user["id"]])
-    
-    total = sum(float(item["price"]) * item["quantity"] for item in cart_items)
+    cart_items = await sql(Q_CART_ITEMS_BY_USER, [current_user.id])
     
+    total = sum(item["price"] * item["quantity"] for item in cart_items)
+
     items = [
         {
             "id": item["id"],
@@ -538,7 +826,7 @@ async def get_cart(current_user):
             "product": {
                 "id": item["product_id"],
                 "name": item["name"],
-                "price": float(item["price"]),  # Convert to float
+                "price": item["price"],
                 "image_url": item["image_url"]
             }
         }
@@ -553,9 +841,8 @@ async def get_cart(current_user):
 
 @app.route('/cart/items', methods=['POST'])
 @token_required
-@run_async
 async def add_to_cart(current_user):
-    data = request.get_json()
+    data = await request.get_json()
     
     product_id = data.get('product_id')
     quantity = data.get('quantity', 1)
@@ -564,99 +851,77 @@ async def add_to_cart(current_user):
         return jsonify({"message": "Product ID is required"}), 400
     
     # Check if product exists
-    product = await sql("SELECT * FROM products WHERE id = $1", [product_id])
-    if not product:
+    if await sql_val("SELECT 1 FROM products WHERE id = $1", [product_id]) is None:
         return jsonify({"message": "Product not found"}), 404
-    
-    # Check if item already in cart
-    existing_item = await sql(
-        "SELECT * FROM cart_items WHERE user_id = $1 AND product_id = $2",
-        [current_user["id"], product_id]
+
+    # Insert or bump quantity in one atomic statement
+    result = await sql_one(
+        """INSERT INTO cart_items (user_id, product_id, quantity) VALUES ($1, $2, $3)
+           ON CONFLICT (user_id, product_id)
+           DO UPDATE SET quantity = cart_items.quantity + EXCLUDED.quantity
+           RETURNING *""",
+        [current_user.id, product_id, quantity]
     )
-    
-    if existing_item:
-        # Update quantity
-        result = await sql(
-            "UPDATE cart_items SET quantity = quantity + $1 WHERE id = $2 RETURNING *",
-            [quantity, existing_item[0]["id"]]
-        )
-        return jsonify(result[0])
-    else:
-        # Create new cart item
-        result = await sql(
-            "INSERT INTO cart_items (user_id, product_id, quantity) VALUES ($1, $2, $3) RETURNING *",
-            [current_user["id"], product_id, quantity]
-        )
-        return jsonify(result[0]), 201
+    return jsonify(result), 201
 
 @app.route('/cart/items/<int:item_id>', methods=['PUT'])
 @token_required
-@run_async
 async def update_cart_item(current_user, item_id):
-    data = request.get_json()
+    data = await request.get_json()
     quantity = data.get('quantity')
     
     if quantity is None:
         return jsonify({"message": "Quantity is required"}), 400
     
-    cart_item = await sql(
-        "SELECT * FROM cart_items WHERE id = $1 AND user_id = $2",
-        [item_id, current_user["id"]]
-    )
-    
-    if not cart_item:
-        return jsonify({"message": "Cart item not found"}), 404
-    
     if quantity <= 0:
         # Remove item if quantity is 0 or less
-        await sql("DELETE FROM cart_items WHERE id = $1", [item_id])
+        deleted = await sql_val(
+            "DELETE FROM cart_items WHERE id = $1 AND user_id = $2 RETURNING id",
+            [item_id, current_user.id]
+        )
+        if deleted is None:
+            return jsonify({"message": "Cart item not found"}), 404
         return jsonify({"message": "Item removed from cart"})
     else:
-        # Update quantity
-        result = await sql(
-            "UPDATE cart_items SET quantity = $1 WHERE id = $2 RETURNING *",
-            [quantity, item_id]
+        # Update quantity; ownership is enforced by the WHERE clause so no
+        # separate lookup round-trip is needed
+        result = await sql_one(
+            "UPDATE cart_items SET quantity = $1 WHERE id = $2 AND user_id = $3 RETURNING *",
+            [quantity, item_id, current_user.id]
         )
-        return jsonify(result[0])
+        if result is None:
+            return jsonify({"message": "Cart item not found"}), 404
+        return jsonify(result)
 
 @app.route('/cart/items/<int:item_id>', methods=['DELETE'])
 @token_required
-@run_async
 async def remove_from_cart(current_user, item_id):
-    cart_item = await sql(
-        "SELECT * FROM cart_items WHERE id = $1 AND user_id = $2",
-        [item_id, current_user["id"]]
+    deleted = await sql_val(
+        "DELETE FROM cart_items WHERE id = $1 AND user_id = $2 RETURNING id",
+        [item_id, current_user.id]
     )
-    
-    if not cart_item:
+
+    if deleted is None:
         return jsonify({"message": "Cart item not found"}), 404
-    
-    await sql("DELETE FROM cart_items WHERE id = $1", [item_id])
+
     return jsonify({"message": "Item removed from cart"})
 
 # PayPal Payment endpoints
 @app.route('/checkout', methods=['POST'])
 @token_required
-@run_async
 async def create_payment(current_user):
-    data = request.get_json()
+    data = await request.get_json()
     payment_method = data.get('payment_method', 'paypal')
     return_url = data.get('return_url', 'https://your-frontend-domain.vercel.app/payment/success')
     cancel_url = data.get('cancel_url', 'https://your-frontend-domain.vercel.app/payment/cancel')
     
     # Get cart items
-    cart_items = await sql("""
-        SELECT ci.*, p.name, p.price, p.image_url 
-        FROM cart_items ci 
-        JOIN products p ON ci.product_id = p.id 
-        WHERE ci.user_id = $1
-    """, [current_user["id"]])
+    cart_items = await sql(Q_CART_ITEMS_BY_USER, [current_user.id])
     
     if not cart_items:
         return jsonify({"message": "Cart is empty"}), 400
     
-    # Calculate total with proper float conversion
-    total_amount = sum(float(item["price"]) * item["quantity"] for item in cart_items)
+    total_amount = sum(item["price"] * item["quantity"] for item in cart_items)
     
     if payment_method == "paypal" and paypal_client_id:
         # Create PayPal payment
@@ -665,7 +930,7 @@ async def create_payment(current_user):
             items.append({
                 "name": item["name"],
                 "sku": str(item["product_id"]),
-                "price": str(float(item["price"])),  # Ensure float conversion
+                "price": str(item["price"]),
                 "currency": "USD",
                 "quantity": item["quantity"]
             })
@@ -687,35 +952,34 @@ async def create_payment(current_user):
                     "total": str(total_amount),
                     "currency": "USD"
                 },
-                "description": f"Order for {current_user['username']}"
+                "description": f"Order for {current_user.username}"
             }]
         })
         
-        if payment.create():
-            # Store payment info temporarily
-            order_result = await sql(
-                "INSERT INTO orders (user_id, total_amount, payment_intent_id, status) VALUES ($1, $2, $3, $4) RETURNING *",
-                [current_user["id"], total_amount, payment.id, "pending_payment"]
-            )
-            order = order_result[0]
-            
-            # Create order items
-            for cart_item in cart_items:
-                await sql(
-                    "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES ($1, $2, $3, $4)",
-                    [order["id"], cart_item["product_id"], cart_item["quantity"], float(cart_item["price"])]
-                )
-            
+        # The PayPal SDK is a blocking requests client; keep its RTT off the loop
+        created = await asyncio.to_thread(payment.create)
+
+        if created:
+            # Store the pending order and its items atomically on one connection
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    order_id = await conn.fetchval(
+                        "INSERT INTO orders (user_id, total_amount, payment_intent_id, status) VALUES ($1, $2, $3, $4) RETURNING id",
+                        current_user.id, total_amount, payment.id, "pending_payment"
+                    )
+                    await insert_order_items(conn, order_id, cart_items)
+
             # Get approval URL
             approval_url = None
             for link in payment.links:
                 if link.rel == "approval_url":
                     approval_url = link.href
                     break
-            
+
             return jsonify({
                 "payment_id": payment.id,
-                "order_id": order["id"],
+                "order_id": order_id,
                 "approval_url": approval_url,
                 "total_amount": total_amount
             })
@@ -723,23 +987,18 @@ async def create_payment(current_user):
             return jsonify({"message": f"PayPal payment creation failed: {payment.error}"}), 400
     
     else:
-        # Fallback to mock payment for other methods
-        order_result = await sql(
-            "INSERT INTO orders (user_id, total_amount, payment_intent_id) VALUES ($1, $2, $3) RETURNING *",
-            [current_user["id"], total_amount, f"mock_{int(datetime.now(timezone.utc).timestamp())}"]
-        )
-        order = order_result[0]
-        
-        # Create order items with proper float conversion
-        for cart_item in cart_items:
-            await sql(
-                "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES ($1, $2, $3, $4)",
-                [order["id"], cart_item["product_id"], cart_item["quantity"], float(cart_item["price"])]
-            )
-        
-        # Clear cart
-        await sql("DELETE FROM cart_items WHERE user_id = $1", [current_user["id"]])
-        
+        # Fallback to mock payment for other methods; order, items, and cart
+        # clear commit or roll back together
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                order = await conn.fetchrow(
+                    "INSERT INTO orders (user_id, total_amount, payment_intent_id) VALUES ($1, $2, $3) RETURNING id, payment_intent_id",
+                    current_user.id, total_amount, f"mock_{int(datetime.now(timezone.utc).timestamp())}"
+                )
+                await insert_order_items(conn, order["id"], cart_items)
+                await conn.execute("DELETE FROM cart_items WHERE user_id = $1", current_user.id)
+
         return jsonify({
             "order_id": order["id"],
             "total_amount": total_amount,
@@ -749,9 +1008,8 @@ async def create_payment(current_user):
 
 @app.route('/payment/execute', methods=['POST'])
 @token_required
-@run_async
 async def execute_payment(current_user):
-    data = request.get_json()
+    data = await request.get_json()
     payment_id = data.get('payment_id')
     payer_id = data.get('payer_id')
     
@@ -759,29 +1017,29 @@ async def execute_payment(current_user):
         return jsonify({"message": "Payment ID and Payer ID are required"}), 400
     
     try:
-        # Find the payment and execute it
-        payment = paypalrestsdk.Payment.find(payment_id)
-        
-        if payment.execute({"payer_id": payer_id}):
-            # Payment successful, update order status
-            await sql(
-                "UPDATE orders SET status = 'created' WHERE payment_intent_id = $1 AND user_id = $2",
-                [payment_id, current_user["id"]]
-            )
-            
-            # Clear cart
-            await sql("DELETE FROM cart_items WHERE user_id = $1", [current_user["id"]])
-            
-            # Get order details
-            order = await sql(
-                "SELECT * FROM orders WHERE payment_intent_id = $1 AND user_id = $2",
-                [payment_id, current_user["id"]]
-            )
-            
+        # Find the payment and execute it; both are blocking HTTP calls to
+        # PayPal, so run them off the event loop
+        payment = await asyncio.to_thread(paypalrestsdk.Payment.find, payment_id)
+
+        if await asyncio.to_thread(payment.execute, {"payer_id": payer_id}):
+            # Payment successful: flip the order, clear the cart, and read the
+            # order id on one connection in one transaction
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    order_id = await conn.fetchval(
+                        "UPDATE orders SET status = 'created' WHERE payment_intent_id = $1 AND user_id = $2 RETURNING id",
+                        payment_id, current_user.id
+                    )
+                    await conn.execute("DELETE FROM cart_items WHERE user_id = $1", current_user.id)
+
+            if order_id is not None:
+                invalidate_order(order_id)
+
             return jsonify({
                 "status": "success",
                 "payment_id": payment.id,
-                "order_id": order[0]["id"] if order else None,
+                "order_id": order_id,
                 "message": "Payment completed successfully"
             })
         else:
@@ -791,128 +1049,177 @@ async def execute_payment(current_user):
         return jsonify({"message": f"Payment execution error: {str(e)}"}), 400
 
 @app.route('/payment/cancel', methods=['GET'])
-def payment_cancelled():
+async def payment_cancelled():
     return jsonify({"status": "cancelled", "message": "Payment was cancelled by user"})
 
 # Order management endpoints
 @app.route('/orders', methods=['GET'])
 @token_required
-@run_async
 async def get_user_orders(current_user):
     skip = int(request.args.get('skip', 0))
     limit = int(request.args.get('limit', 20))
     
     # Get orders with items separately to avoid array aggregation issues
-    orders = await sql("""
-        SELECT o.id, o.total_amount, o.status, o.created_at, o.payment_intent_id,
-               COUNT(oi.id) as item_count
-        FROM orders o
-        LEFT JOIN order_items oi ON o.id = oi.order_id
-        WHERE o.user_id = $1 AND o.status != 'pending_payment'
-        GROUP BY o.id, o.total_amount, o.status, o.created_at, o.payment_intent_id
-        ORDER BY o.created_at DESC
-        LIMIT $2 OFFSET $3
-    """, [current_user["id"], limit, skip])
-    
-    # Convert total_amount to float for each order
-    for order in orders:
-        order["total_amount"] = float(order["total_amount"])
+    orders = await sql(Q_USER_ORDERS, [current_user.id, limit, skip])
     
-    # Get items for each order
-    for order in orders:
-        items = await sql("""
-            SELECT oi.id, oi.product_id, oi.quantity, oi.price,
-                   p.name as product_name, p.image_url
-            FROM order_items oi
-            JOIN products p ON oi.product_id = p.id
-            WHERE oi.order_id = $1
-        """, [order["id"]])
-        
-        # Convert item prices to float
+    # Get items for all orders in one query instead of one query per order
+    items_by_order = {order["id"]: [] for order in orders}
+    if orders:
+        items = await sql(Q_ORDER_ITEMS_FOR_ORDERS, [list(items_by_order.keys())])
+
         for item in items:
-            item["price"] = float(item["price"])
-        
-        order["items"] = items
-    
+            items_by_order[item.pop("order_id")].append(item)
+
+    for order in orders:
+        order["items"] = items_by_order[order["id"]]
+
     return jsonify(orders)
 
 @app.route('/orders/<int:order_id>', methods=['GET'])
 @token_required
-@run_async
 async def get_order_details(current_user, order_id):
+    cache_key = (order_id, current_user.id)
+    order = _order_cache.get(cache_key)
+    if order is not None:
+        return jsonify(order)
+
     # Get order details
-    order = await sql("""
-        SELECT o.id, o.total_amount, o.status, o.created_at, o.payment_intent_id
-        FROM orders o
-        WHERE o.id = $1 AND o.user_id = $2
-    """, [order_id, current_user["id"]])
-    
-    if not order:
+    order = await sql_one(Q_ORDER_BY_ID_AND_USER, [order_id, current_user.id])
+
+    if order is None:
         return jsonify({"message": "Order not found"}), 404
-    
-    # Convert total_amount to float
-    order[0]["total_amount"] = float(order[0]["total_amount"])
-    
+
     # Get order items
-    items = await sql("""
-        SELECT oi.id, oi.product_id, oi.quantity, oi.price,
-               p.name as product_name, p.image_url
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.id
-        WHERE oi.order_id = $1
-    """, [order_id])
-    
-    # Convert item prices to float
-    for item in items:
-        item["price"] = float(item["price"])
-    
-    order_details = order[0]
-    order_details["items"] = items
-    
-    return jsonify(order_details)
+    items = await sql(Q_ORDER_ITEMS, [order_id])
+
+    order["items"] = items
+    _order_cache[cache_key] = order
+
+    return jsonify(order)
 
 @app.route('/orders/<int:order_id>/cancel', methods=['PUT'])
 @token_required
-@run_async
 async def cancel_order(current_user, order_id):
-    order = await sql("SELECT * FROM orders WHERE id = $1 AND user_id = $2", [order_id, current_user["id"]])
-    
-    if not order:
-        return jsonify({"message": "Order not found"}), 404
-    
-    if order[0]["status"] not in ["created", "pending_payment"]:
+    try:
+        expected = _if_match_version(request.headers)
+    except ValueError:
+        return jsonify({"message": "Invalid If-Match header"}), 400
+
+    # Check-and-cancel in one atomic statement; the common success case
+    # costs a single round-trip and there is no window for the status to
+    # change between check and update. With If-Match, a stale retry fails
+    # the version predicate and writes nothing.
+    if expected is None:
+        version = await sql_val(Q_CANCEL_ORDER, [order_id, current_user.id])
+    else:
+        version = await sql_val(Q_CANCEL_ORDER_IF_MATCH, [order_id, current_user.id, expected])
+
+    if version is None:
+        # Only on the failure path: distinguish missing from stale from
+        # non-cancellable
+        row = await sql_one(Q_ORDER_STATUS, [order_id, current_user.id])
+        if row is None:
+            return jsonify({"message": "Order not found"}), 404
+        if expected is not None and row["version"] != expected:
+            return jsonify({"message": "Order was modified; refresh and retry"}), 412
         return jsonify({"message": "Cannot cancel order that is not in created or pending status"}), 400
-    
-    await sql("UPDATE orders SET status = 'cancelled' WHERE id = $1", [order_id])
-    
-    return jsonify({"message": "Order cancelled successfully"})
+
+    invalidate_order(order_id)
+    response = _json_response(_CANCEL_OK_BYTES)
+    response.set_etag(str(version))
+    return response
 
 @app.route('/orders/<int:order_id>/status', methods=['PUT'])
 @token_required
-@run_async
 async def update_order_status(current_user, order_id):
     # Check if user is admin or vendor
-    if current_user["role"] not in [UserRole.ADMIN.value, UserRole.VENDOR.value]:
+    if current_user.role not in [UserRole.ADMIN.value, UserRole.VENDOR.value]:
         return jsonify({"message": "Not authorized to update order status"}), 403
     
-    data = request.get_json()
-    status = data.get('status')
+    data = await request.get_json()
+    status = data.get('status') if data else None
     
-    # Valid statuses
-    valid_statuses = ["created", "confirmed", "shipped", "delivered", "cancelled", "pending_payment"]
-    if status not in valid_statuses:
-        return jsonify({"message": f"Invalid status. Must be one of: {valid_statuses}"}), 400
-    
-    # Update order status
-    result = await sql(
-        "UPDATE orders SET status = $1 WHERE id = $2 RETURNING *",
-        [status, order_id]
+    if status not in VALID_STATUSES:
+        return jsonify({"message": VALID_STATUSES_MSG}), 400
+
+    try:
+        expected = _if_match_version(request.headers)
+    except ValueError:
+        return jsonify({"message": "Invalid If-Match header"}), 400
+
+    # Update order status; with If-Match, a stale retry fails the version
+    # predicate and writes nothing
+    if expected is None:
+        version = await sql_val(
+            Q_UPDATE_ORDER_STATUS,
+            [status, order_id, current_user.role, current_user.id]
+        )
+    else:
+        version = await sql_val(
+            Q_UPDATE_ORDER_STATUS_IF_MATCH,
+            [status, order_id, current_user.role, current_user.id, expected]
+        )
+
+    if version is None:
+        # Only on the failure path: distinguish missing from stale from
+        # not authorized
+        current = await sql_val(Q_ORDER_VERSION, [order_id])
+        if current is None:
+            return jsonify({"message": "Order not found"}), 404
+        if expected is not None and current != expected:
+            return jsonify({"message": "Order was modified; refresh and retry"}), 412
+        return jsonify({"message": "Not authorized to update this order"}), 403
+
+    invalidate_order(order_id)
+    response = _json_response(_STATUS_OK_BYTES[status])
+    response.set_etag(str(version))
+    return response
+
+@app.route('/orders/status/bulk', methods=['PUT'])
+@token_required
+async def bulk_update_order_status(current_user):
+    # Check if user is admin or vendor
+    if current_user.role not in [UserRole.ADMIN.value, UserRole.VENDOR.value]:
+        return jsonify({"message": "Not authorized to update order status"}), 403
+
+    data = await request.get_json()
+    updates = data.get('updates') if data else None
+
+    if not updates:
+        return jsonify({"message": "updates is required"}), 400
+
+    statuses = []
+    order_ids = []
+    for update in updates:
+        if not isinstance(update, dict):
+            return jsonify({"message": "Each update must be an object with order_id and status"}), 400
+        order_id = update.get('order_id')
+        status = update.get('status')
+        if not isinstance(order_id, int) or status not in VALID_STATUSES:
+            return jsonify({"message": VALID_STATUSES_MSG}), 400
+        statuses.append(status)
+        order_ids.append(order_id)
+
+    # Duplicate ids would make UPDATE ... FROM unnest pick an arbitrary
+    # winner per row, so the batch must name each order at most once
+    if len(set(order_ids)) != len(order_ids):
+        return jsonify({"message": "Duplicate order_id in updates"}), 400
+
+    # One statement for the whole batch; the per-row authorization predicate
+    # mirrors the single-order route, and RETURNING reports the orders that
+    # were actually updated
+    updated = await sql(
+        Q_BULK_UPDATE_ORDER_STATUS,
+        [statuses, order_ids, current_user.role, current_user.id]
     )
-    
-    if not result:
-        return jsonify({"message": "Order not found"}), 404
-    
-    return jsonify({"message": f"Order status updated to {status}"})
+
+    for row in updated:
+        invalidate_order(row["id"])
+
+    return jsonify({"message": f"{len(updated)} orders updated"})
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
+    # Local development only - production runs under gunicorn/uvicorn
+    # (see gunicorn.conf.py); the debug reloader and traceback middleware
+    # must never be enabled on a deployed instance
+    app.run(host='0.0.0.0', port=8000)
\ No newline at end of file
@@ -0,0 +1,3 @@
+-- Required for the ON CONFLICT upsert in POST /cart/items
+ALTER TABLE cart_items
+    ADD CONSTRAINT cart_items_user_id_product_id_key UNIQUE (user_id, product_id);
@@ -0,0 +1,5 @@
+-- Covering index for the ownership + status lookup in the cancel handler;
+-- INCLUDE (status) makes it an index-only scan with no heap fetch.
+-- CONCURRENTLY cannot run inside a transaction block.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS orders_id_user_status_idx
+    ON orders (id, user_id) INCLUDE (status);
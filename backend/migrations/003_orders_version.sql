@@ -0,0 +1,3 @@
+-- Optimistic-concurrency version for order status mutations. Clients echo
+-- it back via If-Match; a stale retry then returns 412 without writing.
+ALTER TABLE orders ADD COLUMN version integer NOT NULL DEFAULT 0;
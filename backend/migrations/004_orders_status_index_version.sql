@@ -0,0 +1,7 @@
+-- Migration 002's index covered only status; the failure-path lookup now
+-- also reads version, which forced a heap fetch. Rebuild the index with
+-- both payload columns so the query is index-only again.
+-- CONCURRENTLY cannot run inside a transaction block.
+DROP INDEX CONCURRENTLY IF EXISTS orders_id_user_status_idx;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS orders_id_user_status_idx
+    ON orders (id, user_id) INCLUDE (status, version);